@@ -29,35 +29,90 @@ Example usage:
 # Handles both directional (N/S) and non-directional stop IDs
 
 import csv
+import sys
 import pandas as pd
 
+# GTFS direction suffixes: northbound and southbound platforms
+_DIRECTIONS = ('N', 'S')
+
+# The graph caches pickle ComplexesData instances; bump this whenever the
+# attributes set in __init__ change so those caches are rebuilt
+CACHE_VERSION = 1
+
+def _with_fallback_spellings(mapping: dict[str, str]) -> dict[str, str]:
+    """Extend a GTFS stop id keyed dict with the spellings the lookups fall back to.
+
+    A lookup tries the exact id first, then the id without its direction
+    suffix ("A34N" -> "A34"), or for a bare id the northbound id
+    ("A34" -> "A34N"). Materializing those alternatives up front turns the
+    lookup into one ``dict.get``.
+    """
+    merged = {stop_id: value for stop_id, value in mapping.items() if value}
+    for stop_id, value in mapping.items():
+        if not value:
+            continue
+        # Directional spellings strip back to this id
+        for direction in _DIRECTIONS:
+            merged.setdefault(sys.intern(stop_id + direction), value)
+        # A bare id falls back to its northbound spelling
+        bare = stop_id[:-1]
+        if stop_id.endswith('N') and bare and not bare.endswith(_DIRECTIONS):
+            merged.setdefault(sys.intern(bare), value)
+    return merged
+
 class ComplexesData:
     def __init__(self, csv_path: str = 'data/Complexes.csv', gtfs_dir: str = 'data/gtfs_subway'):
         self.complex_id_by_gtfs = {}
         self.complex_info = {}
         
         # Load GTFS stops data
-        self._stops = pd.read_csv(f"{gtfs_dir}/stops.txt")
-        self.stop_name_map = dict(zip(self._stops.stop_id, self._stops.stop_name))
-
-        with open(csv_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                complex_id = row['Complex ID']
-                num_stations = int(row['Number Of Stations In Complex'])
-                gtfs_stop_ids = row['GTFS Stop IDs']
-                # Some rows have multiple GTFS stop ids separated by semicolons
-                gtfs_list = [gtfs.strip() for gtfs in gtfs_stop_ids.split(';') if gtfs.strip()]
-                self.complex_info[complex_id] = {
-                    'num_stations': num_stations,
-                    'gtfs_stop_ids': gtfs_list
-                }
-                # Store mapping for both with and without direction suffix
-                for gtfs in gtfs_list:
-                    self.complex_id_by_gtfs[gtfs] = complex_id
-                    # Also store without direction suffix
-                    if gtfs[-1] in ['N', 'S']:
-                        self.complex_id_by_gtfs[gtfs[:-1]] = complex_id
+        with open(f"{gtfs_dir}/stops.txt", newline='', encoding='utf-8') as stopsfile:
+            reader = csv.DictReader(stopsfile)
+            self.stop_name_map = {sys.intern(row['stop_id']): row['stop_name'] for row in reader}
+
+        complexes = pd.read_csv(
+            csv_path,
+            usecols=['Complex ID', 'Number Of Stations In Complex', 'GTFS Stop IDs'],
+            dtype={'Complex ID': str, 'GTFS Stop IDs': str},
+        )
+        # Intern ids so dict probes during graph building compare by identity
+        complexes['Complex ID'] = complexes['Complex ID'].map(sys.intern)
+
+        # Some rows have multiple GTFS stop ids separated by semicolons
+        gtfs = (
+            complexes.assign(gtfs=complexes['GTFS Stop IDs'].str.split(';'))
+                     .explode('gtfs')[['Complex ID', 'gtfs']]
+        )
+        gtfs['gtfs'] = gtfs['gtfs'].str.strip()
+        gtfs = gtfs[gtfs['gtfs'].notna() & (gtfs['gtfs'] != '')]
+        gtfs = gtfs.assign(gtfs=gtfs['gtfs'].map(sys.intern))
+        gtfs_lists = gtfs.groupby('Complex ID', sort=False)['gtfs'].agg(list)
+
+        for complex_id, num_stations in zip(complexes['Complex ID'],
+                                            complexes['Number Of Stations In Complex']):
+            self.complex_info[complex_id] = {
+                'num_stations': int(num_stations),
+                'gtfs_stop_ids': gtfs_lists.get(complex_id, [])
+            }
+
+        # Store mapping for both with and without direction suffix
+        directional = gtfs['gtfs'].str.endswith(_DIRECTIONS)
+        self.complex_id_by_gtfs.update(zip(gtfs.loc[directional, 'gtfs'].str[:-1].map(sys.intern),
+                                           gtfs.loc[directional, 'Complex ID']))
+        self.complex_id_by_gtfs.update(zip(gtfs['gtfs'], gtfs['Complex ID']))
+
+        # Primary station name of each complex: the first of its GTFS stops with a name
+        self.primary_name = {}
+        for complex_id, info in self.complex_info.items():
+            for stop_id in info['gtfs_stop_ids']:
+                name = self.stop_name_map.get(stop_id)
+                if name:
+                    self.primary_name[complex_id] = name
+                    break
+
+        # Resolve every accepted GTFS stop id spelling with a single dict probe
+        self._merged_complex_ids = _with_fallback_spellings(self.complex_id_by_gtfs)
+        self._merged_names = _with_fallback_spellings(self.stop_name_map)
 
     def get_complex_id_by_gtfs_stop_id(self, gtfs_stop_id):
         """Return the complex id for a given GTFS stop id, or None if not found.
@@ -67,17 +122,17 @@ class ComplexesData:
         gtfs_stop_id : str
             GTFS stop ID, with or without direction suffix (e.g. "A34" or "A34N")
         """
-        # Try exact match first
-        complex_id = self.complex_id_by_gtfs.get(gtfs_stop_id)
-        if complex_id:
-            return complex_id
-            
-        # If not found and has direction suffix, try without it
-        if gtfs_stop_id[-1] in ['N', 'S']:
-            return self.complex_id_by_gtfs.get(gtfs_stop_id[:-1])
-            
-        # If not found and no direction suffix, try with N
-        return self.complex_id_by_gtfs.get(gtfs_stop_id + 'N')
+        return self._merged_complex_ids.get(gtfs_stop_id)
+
+    def stop_to_complex_map(self) -> dict[str, str]:
+        """Return a dict resolving every accepted GTFS stop id spelling to its complex id.
+
+        Directional ids ("A34N", "A34S") and their bare form ("A34") are all
+        materialized, so ``stop_to_complex_map().get(stop_id)`` gives the same
+        result as :meth:`get_complex_id_by_gtfs_stop_id`. The dict is shared
+        with this instance and must not be mutated.
+        """
+        return self._merged_complex_ids
 
     def get_number_of_stations(self, complex_id):
         """Return the number of stations in a complex, or None if not found."""
@@ -121,8 +176,7 @@ class ComplexesData:
 
     def get_station_name(self, complex_id):
         """Return the primary station name for a complex ID."""
-        names = self.get_names_of_stations(complex_id)
-        return names[0] if names else "Unknown"
+        return self.primary_name.get(str(complex_id), "Unknown")
 
     def get_station_name_by_gtfs_id(self, gtfs_stop_id: str) -> str | None:
         """Get the station name for a GTFS stop ID.
@@ -143,17 +197,7 @@ class ComplexesData:
         >>> complexes.get_station_name_by_gtfs_id("A34N")
         'Times Square-42 St'
         """
-        # Try exact match first
-        name = self.stop_name_map.get(gtfs_stop_id)
-        if name:
-            return name
-            
-        # If not found and has direction suffix, try without it
-        if gtfs_stop_id[-1] in ['N', 'S']:
-            return self.stop_name_map.get(gtfs_stop_id[:-1])
-            
-        # If not found and no direction suffix, try with N
-        return self.stop_name_map.get(gtfs_stop_id + 'N')
+        return self._merged_names.get(gtfs_stop_id)
 
 # Example usage:
 # complexes = ComplexesData('data/Complexes.csv')
@@ -0,0 +1,63 @@
+"""
+graph_cache - On-disk cache for the built subway graphs.
+
+A graph class pickles the attributes it lists under ``data/.cache``, in a
+file named after its prefix and a key hashed from the cache version and
+the modification times of the GTFS and complex input files. The version
+combines the class's own cache version with complexes.CACHE_VERSION, since
+both graph classes pickle a ComplexesData instance. Later builds load that
+file instead of parsing the inputs again, until an input file changes or
+either version is bumped.
+"""
+
+import hashlib
+import pickle
+from pathlib import Path
+
+import complexes
+
+CACHE_DIR = Path("data/.cache")
+
+
+def cache_path(prefix: str, gtfs_dir: Path, version: int) -> Path:
+    """Return the cache file for the current state of the input files."""
+    inputs = [gtfs_dir / "stops.txt", gtfs_dir / "trips.txt",
+              gtfs_dir / "stop_times.txt", Path("data/Complexes.csv")]
+    mtimes = ",".join(str(path.stat().st_mtime_ns) for path in inputs)
+    key = hashlib.sha1(f"{version}:{complexes.CACHE_VERSION}:{mtimes}".encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{prefix}_{key}.pkl"
+
+
+def load_cache(path: Path, owner: type, attrs: tuple[str, ...]) -> bool:
+    """Restore attrs on owner from the cache file, returning whether it was found.
+
+    A file that can't be read or lacks any of attrs counts as a miss.
+    """
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return False
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print(f"Warning: Ignoring unreadable graph cache {path}: {e}")
+        return False
+    if not isinstance(state, dict) or any(name not in state for name in attrs):
+        print(f"Warning: Ignoring incomplete graph cache {path}")
+        return False
+    for name in attrs:
+        setattr(owner, name, state[name])
+    return True
+
+
+def save_cache(path: Path, prefix: str, owner: type, attrs: tuple[str, ...]) -> None:
+    """Pickle attrs of owner to the cache file, removing stale files with the same prefix."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for stale in path.parent.glob(f"{prefix}_*.pkl"):
+            if stale != path:
+                stale.unlink()
+        state = {name: getattr(owner, name) for name in attrs}
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"Warning: Could not write graph cache {path}: {e}")
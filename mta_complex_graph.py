@@ -12,9 +12,11 @@ The graph is built using data from GTFS files and station complex information.
 """
 
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import networkx as nx
 from complexes import ComplexesData
+import graph_cache
 
 class MTAComplexGraph:
     """An undirected graph representation of the NYC subway system.
@@ -28,13 +30,30 @@ class MTAComplexGraph:
     
     # Class-level caches
     G: nx.Graph | None = None          # the undirected graph itself
-    _stops: pd.DataFrame | None = None
-    _trips: pd.DataFrame | None = None
-    _stop_times: pd.DataFrame | None = None
     _complexes: ComplexesData | None = None
+    _stop_to_complex: dict[str, str] | None = None
+    _trips_by_route_dir: dict[tuple[str, int], str] | None = None
+    _stops_by_trip: dict[str, list[str]] | None = None
+
+    # Compressed sparse row (CSR) adjacency used for queries; G is kept for
+    # inspection and debugging
+    _index: dict[str, int] | None = None        # complex_id -> dense index
+    _complex_ids: list[str] | None = None       # dense index -> complex_id
+    _indptr: np.ndarray | None = None           # neighbours of i: indices[indptr[i]:indptr[i+1]]
+    _indices: np.ndarray | None = None
+    _edge_lines: list[tuple[str, ...]] | None = None  # lines for each slot of indices
+
+    # Attributes persisted by the on-disk graph cache; bump the version
+    # whenever the CSR layout changes shape so stale caches are rebuilt
+    # (ComplexesData changes are covered by complexes.CACHE_VERSION)
+    _CACHE_PREFIX = "graph"
+    _CACHE_VERSION = 1
+    _CACHED_ATTRS = ('G', '_complexes', '_stop_to_complex', '_trips_by_route_dir',
+                     '_stops_by_trip', '_index', '_complex_ids', '_indptr',
+                     '_indices', '_edge_lines')
 
     @classmethod
-    def build_graph(cls, gtfs_dir: str | Path = "data/gtfs_subway") -> None:
+    def build_graph(cls, gtfs_dir: str | Path = "data/gtfs_subway", use_cache: bool = True) -> None:
         """Build the subway graph from GTFS data and station complex information.
         
         This method creates an undirected graph where:
@@ -45,68 +64,147 @@ class MTAComplexGraph:
         
         Parameters:
             gtfs_dir (str | Path): Directory containing GTFS data files
+            use_cache (bool): Load from / save to the on-disk graph cache (see graph_cache)
         """
         gtfs_dir = Path(gtfs_dir)
 
+        cache_path = None
+        if use_cache:
+            cache_path = graph_cache.cache_path(cls._CACHE_PREFIX, gtfs_dir, cls._CACHE_VERSION)
+            if graph_cache.load_cache(cache_path, cls, cls._CACHED_ATTRS):
+                return
+
         # Initialize complexes data
         cls._complexes = ComplexesData()
 
-        # Load GTFS data
-        cls._stops = pd.read_csv(gtfs_dir / "stops.txt")
-        cls._trips = pd.read_csv(gtfs_dir / "trips.txt")
-        cls._stop_times = pd.read_csv(gtfs_dir / "stop_times.txt")
+        # Load GTFS data; the frames are only needed while building
+        trips = pd.read_csv(
+            gtfs_dir / "trips.txt",
+            usecols=['route_id', 'trip_id', 'direction_id'],
+            dtype={'route_id': 'category', 'direction_id': 'int8'},
+            engine='c',
+        )
+        stop_times = pd.read_csv(
+            gtfs_dir / "stop_times.txt",
+            usecols=['trip_id', 'stop_id', 'stop_sequence'],
+            dtype={'trip_id': 'category', 'stop_id': 'category', 'stop_sequence': 'int32'},
+            engine='c',
+        )
+
+        # Index the representative (first) trip of each route and direction,
+        # and the ordered GTFS stops of those trips, so per-route lookups
+        # don't rescan the frames
+        cls._trips_by_route_dir = (
+            trips.groupby(['route_id', 'direction_id'], observed=True)['trip_id'].first().to_dict()
+        )
+        representative = stop_times[
+            stop_times.trip_id.isin(set(cls._trips_by_route_dir.values()))
+        ]
+        cls._stops_by_trip = {
+            trip_id: stops.tolist()
+            for trip_id, stops in representative.sort_values('stop_sequence')
+                                                .groupby('trip_id', observed=True)['stop_id']
+        }
 
         # Get unique routes
-        routes = cls._trips['route_id'].unique()
-        
-        # Initialize graph
-        G = nx.Graph()
+        routes = trips['route_id'].unique()
+
+        # Resolve every GTFS stop id spelling to its complex up front so the
+        # route loop below is a single dict probe per stop
+        cls._stop_to_complex = cls._complexes.stop_to_complex_map()
+        stop_to_complex = cls._stop_to_complex
+
+        # Node attributes for every complex
+        node_attrs = {
+            complex_id: dict(stop_name=cls._complexes.get_station_name(complex_id),
+                             gtfs_ids=info['gtfs_stop_ids'])
+            for complex_id, info in cls._complexes.complex_info.items()
+        }
 
-        # Process each route in both directions
+        # Collect the complex ids served by each route and direction. Each
+        # iteration is only a couple of dict lookups, so this stays serial: a
+        # thread pool costs more to start than the whole loop takes
+        route_complex_ids = []
         for route in routes:
             for direction in [0, 1]:
                 try:
-                    # Get ordered stops for this route and direction
-                    stops = cls.ordered_stops(route, direction)
+                    # Get ordered GTFS stops for this route and direction
+                    stops = cls._trip_stops(route, direction)
                     
                     # Convert GTFS stop IDs to complex IDs
-                    complex_ids = []
-                    for stop in stops:
-                        complex_id = cls._complexes.get_complex_id_by_gtfs_stop_id(stop)
-                        if complex_id:
-                            complex_ids.append(complex_id)
-                    
-                    # Add all nodes with their names and GTFS IDs
-                    for complex_id in complex_ids:
-                        if complex_id not in G:
-                            # Get all GTFS IDs for this complex
-                            gtfs_ids = cls._complexes.get_gtfs_stop_ids_by_complex_id(complex_id)
-                            # Get station name
-                            station_name = cls._complexes.get_station_name(complex_id)
-                            G.add_node(complex_id, 
-                                     stop_name=station_name,
-                                     gtfs_ids=gtfs_ids)
-                    
-                    # Create edges between consecutive stops
-                    for i in range(len(complex_ids) - 1):
-                        u = complex_ids[i]
-                        v = complex_ids[i + 1]
-                        
-                        # Add or update edge
-                        if G.has_edge(u, v):
-                            if route not in G[u][v]['lines']:
-                                G[u][v]['lines'].append(route)
-                        else:
-                            G.add_edge(u, v, lines=[route])
+                    complex_ids = [c for s in stops if (c := stop_to_complex.get(s))]
+                    route_complex_ids.append((route, complex_ids))
                 except Exception as e:
                     print(f"Warning: Could not process route {route} direction {direction}: {e}")
 
-        # Sort the lines list for each edge
-        for u, v, data in G.edges(data=True):
-            data['lines'] = sorted(data['lines'])
+        # Give every served complex a dense int index, in complex id order.
+        # The rest of the build and all queries work on these indices
+        complex_ids = sorted({c for _, route_ids in route_complex_ids for c in route_ids})
+        index = {complex_id: i for i, complex_id in enumerate(complex_ids)}
+        cls._complex_ids = complex_ids
+        cls._index = index
+
+        # Collect the lines serving each pair of consecutive stops, keyed by
+        # the pair in sorted order since the graph is undirected
+        edge_lines = {}
+        for route, route_ids in route_complex_ids:
+            stops = [index[c] for c in route_ids]
+            for u, v in zip(stops, stops[1:]):
+                edge = (u, v) if u <= v else (v, u)
+                edge_lines.setdefault(edge, set()).add(route)
+
+        # Freeze each edge's lines into a sorted tuple; edges served by the
+        # same set of lines share one tuple object
+        pool = {}
+        for edge, route_set in edge_lines.items():
+            lines = tuple(sorted(route_set))
+            edge_lines[edge] = pool.setdefault(lines, lines)
+
+        cls._build_adjacency(len(complex_ids), edge_lines)
 
+        # Mirror the network as a NetworkX graph keyed by complex id, with
+        # the station names and GTFS IDs as node attributes
+        G = nx.Graph()
+        G.add_nodes_from((complex_id, node_attrs[complex_id]) for complex_id in complex_ids)
+        G.add_edges_from(
+            (complex_ids[u], complex_ids[v], {'lines': lines})
+            for (u, v), lines in edge_lines.items()
+        )
         cls.G = G
 
+        if cache_path is not None:
+            graph_cache.save_cache(cache_path, cls._CACHE_PREFIX, cls, cls._CACHED_ATTRS)
+
+    @classmethod
+    def _build_adjacency(cls, num_nodes: int, edge_lines: dict[tuple[int, int], tuple[str, ...]]) -> None:
+        """Pack the undirected edges into CSR arrays, each row sorted by neighbour."""
+        rows = [[] for _ in range(num_nodes)]
+        for (u, v), lines in edge_lines.items():
+            rows[u].append((v, lines))
+            if u != v:
+                rows[v].append((u, lines))
+
+        indptr = np.zeros(num_nodes + 1, dtype=np.int32)
+        indices = []
+        slot_lines = []
+        for i, row in enumerate(rows):
+            row.sort(key=lambda neighbour: neighbour[0])
+            for v, lines in row:
+                indices.append(v)
+                slot_lines.append(lines)
+            indptr[i + 1] = len(indices)
+
+        cls._indptr = indptr
+        cls._indices = np.asarray(indices, dtype=np.int32)
+        cls._edge_lines = slot_lines
+
+    @classmethod
+    def _edge_slot(cls, u: int, v: int) -> int | None:
+        """Return the CSR slot of edge (u, v), or None if they aren't adjacent."""
+        start, end = cls._indptr[u], cls._indptr[u + 1]
+        hits = np.flatnonzero(cls._indices[start:end] == v)
+        return int(start + hits[0]) if hits.size else None
+
     @classmethod
     def _assert_built(cls):
         """Raise an error if the graph hasn't been built yet."""
@@ -132,28 +230,20 @@ class MTAComplexGraph:
             ['H01', 'H02', 'H03', ...]  # Complex IDs for A train stops
         """
         cls._assert_built()
-        trip_id = cls._trips.query(
-            "route_id==@route and direction_id==@direction"
-        ).trip_id.iloc[0]
-        
-        # Get GTFS stop IDs in order
-        gtfs_stops = (
-            cls._stop_times.query("trip_id==@trip_id")
-                           .sort_values("stop_sequence")
-                           .stop_id.tolist()
-        )
+        gtfs_stops = cls._trip_stops(route, direction)
         
-        # Convert GTFS stop IDs to complex IDs
-        complex_ids = []
-        for stop in gtfs_stops:
-            complex_id = cls._complexes.get_complex_id_by_gtfs_stop_id(stop)
-            if complex_id and complex_id not in complex_ids:  # Avoid duplicates
-                complex_ids.append(complex_id)
-                
-        return complex_ids
+        # Convert GTFS stop IDs to complex IDs, dropping duplicates in order
+        stop_to_complex = cls._stop_to_complex
+        return list(dict.fromkeys(filter(None, (stop_to_complex.get(s) for s in gtfs_stops))))
 
     @classmethod
-    def connecting_lines(cls, complex_id_1: str, complex_id_2: str) -> list[str]:
+    def _trip_stops(cls, route: str, direction: int) -> list[str]:
+        """Get the GTFS stop IDs of a representative trip, in timetable order."""
+        trip_id = cls._trips_by_route_dir[(route, direction)]
+        return cls._stops_by_trip[trip_id]
+
+    @classmethod
+    def connecting_lines(cls, complex_id_1: str, complex_id_2: str) -> tuple[str, ...]:
         """Get all subway lines that directly connect two stations.
         
         Parameters:
@@ -161,15 +251,18 @@ class MTAComplexGraph:
             complex_id_2 (str): Complex ID of the second station
             
         Returns:
-            list[str]: List of subway lines that connect the stations
+            tuple[str, ...]: Sorted subway lines that connect the stations
         """
         cls._assert_built()
-        if cls.G.has_edge(complex_id_1, complex_id_2):
-            return cls.G[complex_id_1][complex_id_2]['lines']
-        return []
+        u = cls._index.get(complex_id_1)
+        v = cls._index.get(complex_id_2)
+        if u is None or v is None:
+            return ()
+        slot = cls._edge_slot(u, v)
+        return cls._edge_lines[slot] if slot is not None else ()
 
     @classmethod
-    def shortest_path(cls, complex_id_1: str, complex_id_2: str) -> tuple[list[str], list[list[str]]]:
+    def shortest_path(cls, complex_id_1: str, complex_id_2: str) -> tuple[list[str], list[tuple[str, ...]]]:
         """Find the shortest path between two stations and the connecting lines.
         
         Parameters:
@@ -177,9 +270,9 @@ class MTAComplexGraph:
             complex_id_2 (str): Complex ID of the destination station
             
         Returns:
-            tuple[list[str], list[list[str]]]: 
+            tuple[list[str], list[tuple[str, ...]]]: 
                 - List of complex IDs representing the path
-                - List of lists of subway lines connecting each pair of stations
+                - List of the subway lines connecting each pair of stations
                 
         Example:
             >>> path, lines = MTAComplexGraph.shortest_path("618", "164")
@@ -187,20 +280,78 @@ class MTAComplexGraph:
             >>> print(f"Lines: {lines}")
         """
         cls._assert_built()
-        try:
-            # Get the shortest path
-            path = nx.shortest_path(cls.G, source=complex_id_1, target=complex_id_2)
-            
-            # Get the lines for each segment
-            lines = []
-            for i in range(len(path) - 1):
-                u = path[i]
-                v = path[i + 1]
-                lines.append(cls.G[u][v]['lines'])
-            
-            return path, lines
-        except nx.NetworkXNoPath:
+        for complex_id in (complex_id_1, complex_id_2):
+            if complex_id not in cls._index:
+                raise nx.NodeNotFound(f"Node {complex_id} is not in G")
+        source = cls._index[complex_id_1]
+        target = cls._index[complex_id_2]
+
+        found = cls._bidirectional_bfs(source, target)
+        if found is None:
             return [], []
+        path, slots = found
+        return [cls._complex_ids[i] for i in path], [cls._edge_lines[slot] for slot in slots]
+
+    @classmethod
+    def _bidirectional_bfs(cls, source: int, target: int) -> tuple[list[int], list[int]] | None:
+        """Find a shortest path between two dense node ids.
+
+        Breadth-first searches grow from both ends, always expanding the
+        smaller frontier one level, until they meet. Each tree maps a node
+        to the neighbour it was reached from and the CSR slot of that edge.
+        
+        Returns:
+            tuple[list[int], list[int]] | None: The path's node ids and the
+            CSR slot of each segment, or None if the nodes aren't connected
+        """
+        if source == target:
+            return [source], []
+
+        indptr, indices = cls._indptr, cls._indices
+        pred = {source: None}   # trees: node -> (neighbour toward its root, slot)
+        succ = {target: None}
+        forward, backward = [source], [target]
+        meet = None
+        while forward and backward and meet is None:
+            if len(forward) <= len(backward):
+                frontier, tree, other = forward, pred, succ
+            else:
+                frontier, tree, other = backward, succ, pred
+            next_level = []
+            for u in frontier:
+                start = int(indptr[u])
+                for offset, v in enumerate(indices[start:indptr[u + 1]].tolist()):
+                    if v in tree:
+                        continue
+                    tree[v] = (u, start + offset)
+                    if v in other:
+                        meet = v
+                        break
+                    next_level.append(v)
+                if meet is not None:
+                    break
+            if tree is pred:
+                forward = next_level
+            else:
+                backward = next_level
+        if meet is None:
+            return None
+
+        # Walk back to the source, then forward to the target
+        path, slots = [meet], []
+        node = meet
+        while pred[node] is not None:
+            node, slot = pred[node]
+            path.append(node)
+            slots.append(slot)
+        path.reverse()
+        slots.reverse()
+        node = meet
+        while succ[node] is not None:
+            node, slot = succ[node]
+            path.append(node)
+            slots.append(slot)
+        return path, slots
 
 # Example usage:
 if __name__ == "__main__":
@@ -4,9 +4,12 @@ SubwayGraph - A NetworkX-based representation of the NYC subway system.
 This module provides functionality to build and query a graph representation of the
 NYC subway system, where:
 - Nodes represent station complexes (groups of physically connected stations)
-- Edges represent direct connections between stations on the same line
+- Edges represent direct connections between consecutive stations on the same line
 - Edge attributes store which subway lines connect the stations
 
+Queries treat any two stations on the same line as directly connected: a path
+hop is one ride without a transfer, however many stops it passes.
+
 The graph is built using data from GTFS files and station complex information.
 It provides methods to:
 - Find paths between stations
@@ -31,11 +34,13 @@ Example usage:
     >>>     print(SubwayGraph.get_directions_for_path(path))
 """
 
+from collections import deque
 from pathlib import Path
 import itertools
 import pandas as pd
 import networkx as nx
 from complexes import ComplexesData
+import graph_cache
 
 
 class SubwayGraph:
@@ -43,51 +48,84 @@ class SubwayGraph:
     
     This class provides a graph-based representation of the subway system where:
     - Nodes are station complexes (identified by complex IDs like "618")
-    - Edges represent direct connections between stations on the same line
+    - Edges represent direct connections between consecutive stations on the same line
     - Edge attributes store which subway lines connect the stations
     
+    Path queries work on same-line reachability, which is expanded from the
+    stored stop order of each route at query time rather than materialized
+    as an edge between every pair of stations on a line.
+    
     The graph is built using GTFS data and station complex information, providing
     a comprehensive view of the subway network that accounts for station complexes
     and multiple lines sharing the same tracks.
     
     Class Attributes:
-        G (nx.DiGraph): The directed graph representing the subway system
-        _stops (pd.DataFrame): GTFS stops data
-        _trips (pd.DataFrame): GTFS trips data
-        _stop_times (pd.DataFrame): GTFS stop_times data
+        G (nx.DiGraph): The directed graph representing the subway system; its
+            edges join consecutive stops only, so path queries must go through
+            the class methods rather than NetworkX algorithms on G
         _complexes (ComplexesData): Station complex information
+        _name_to_id (dict[str, str]): Station name to complex ID index
+        _id_to_name (dict[str, str]): Complex ID to station name index
+        _ordered_stops_cache (dict): Ordered GTFS stops per (route, direction)
+        _line_order (dict): Ordered distinct complex IDs per (route, direction)
+        _route_stops (list): Ordered complex IDs of each route direction
+        _route_positions (dict): Where each complex appears in _route_stops
+        _parents_from (dict): Cached shortest-path trees by start station
+        _preds_from (dict): Cached all-shortest-paths predecessors by start station
+        _lines_between (dict): Cached connecting lines by station pair
     """
     
     # ------------------------------------------------------------------ #
     # Class-level caches – populate once, re-use everywhere
     # ------------------------------------------------------------------ #
     G: nx.DiGraph | None = None          # the directed graph itself
-    _stops: pd.DataFrame | None = None
-    _trips: pd.DataFrame | None = None
-    _stop_times: pd.DataFrame | None = None
     _complexes: ComplexesData | None = None
+    _name_to_id: dict[str, str] | None = None
+    _id_to_name: dict[str, str] | None = None
+    _ordered_stops_cache: dict[tuple[str, int], list[str]] | None = None
+    _line_order: dict[tuple[str, int], list[str]] | None = None
+    # (route, complex IDs in stop order, last position of each complex) per route direction
+    _route_stops: list[tuple[str, list[str], dict[str, int]]] | None = None
+    # complex ID -> (index into _route_stops, first position on that route)
+    _route_positions: dict[str, list[tuple[int, int]]] | None = None
+    # start complex ID -> BFS search tree, filled in as queries come in
+    _parents_from: dict[str, dict[str, str | None]] = {}
+    _preds_from: dict[str, dict[str, list[str]]] = {}
+    # (u, v) -> sorted lines riding from u to v, filled in as queries come in
+    _lines_between: dict[tuple[str, str], tuple[str, ...]] = {}
+
+    # Attributes persisted by the on-disk graph cache; bump the version
+    # whenever their contents change shape so stale caches are rebuilt
+    # (ComplexesData changes are covered by complexes.CACHE_VERSION)
+    _CACHE_PREFIX = "subway_graph"
+    _CACHE_VERSION = 5
+    _CACHED_ATTRS = ('G', '_complexes', '_name_to_id', '_id_to_name',
+                     '_ordered_stops_cache', '_line_order', '_route_stops',
+                     '_route_positions')
 
     # ------------------------------------------------------------------ #
     # Graph-building
     # ------------------------------------------------------------------ #
     @classmethod
-    def build_graph(cls, gtfs_dir: str | Path = "data/gtfs_subway") -> None:
+    def build_graph(cls, gtfs_dir: str | Path = "data/gtfs_subway", use_cache: bool = True) -> None:
         """Build the subway graph from GTFS data and station complex information.
         
         This method creates a directed graph where:
         - Each node is a station complex (e.g., "618" for Times Square)
-        - Node attributes include the station name and GTFS stop IDs
-        - Edges connect stations that are directly reachable on the same line
+        - Node attributes include the station name, GTFS stop IDs and the lines serving it
+        - Edges connect consecutive stations on the same line
         - Edge attributes list which subway lines connect the stations
         
         The graph is built by:
         1. Loading GTFS data and station complex information
         2. Processing each subway line in both directions
         3. Creating nodes for each station complex
-        4. Creating edges between all pairs of stations on the same line
+        4. Creating edges between consecutive stations on the same line
+        5. Recording the stop order of each line for same-line queries
         
         Parameters:
             gtfs_dir (str | Path): Directory containing GTFS data files
+            use_cache (bool): Load from / save to the on-disk graph cache (see graph_cache)
             
         Example:
             >>> SubwayGraph.build_graph()
@@ -96,19 +134,45 @@ class SubwayGraph:
         """
         gtfs_dir = Path(gtfs_dir)
 
+        # Query caches belong to the previous graph
+        cls._parents_from = {}
+        cls._preds_from = {}
+        cls._lines_between = {}
+
+        cache_path = None
+        if use_cache:
+            cache_path = graph_cache.cache_path(cls._CACHE_PREFIX, gtfs_dir, cls._CACHE_VERSION)
+            if graph_cache.load_cache(cache_path, cls, cls._CACHED_ATTRS):
+                return
+
         # Initialize complexes data
         cls._complexes = ComplexesData()
 
-        # Load GTFS data
-        cls._stops      = pd.read_csv(gtfs_dir / "stops.txt")
-        cls._trips      = pd.read_csv(gtfs_dir / "trips.txt")
-        cls._stop_times = pd.read_csv(gtfs_dir / "stop_times.txt")
+        # Load GTFS data, keeping only the columns the graph uses; the frames
+        # are only needed while building
+        trips = pd.read_csv(
+            gtfs_dir / "trips.txt",
+            usecols=['route_id', 'trip_id', 'direction_id'],
+            dtype={'route_id': 'category', 'direction_id': 'int8'},
+            engine='c',
+        )
+        stop_times = pd.read_csv(
+            gtfs_dir / "stop_times.txt",
+            usecols=['trip_id', 'stop_id', 'stop_sequence'],
+            dtype={'trip_id': 'category', 'stop_id': 'category', 'stop_sequence': 'int32'},
+            engine='c',
+        )
+        cls._index_ordered_stops(trips, stop_times)
 
         # Get unique routes
-        routes = cls._trips['route_id'].unique()
+        routes = trips['route_id'].unique()
         
         # Initialize graph
         G = nx.DiGraph()
+        route_stops = []
+        route_positions = {}
+        line_order = {}
+        stop_to_complex = cls._complexes.stop_to_complex_map()
 
         # Process each route in both directions
         for route in routes:
@@ -118,11 +182,7 @@ class SubwayGraph:
                     stops = cls.ordered_stops(route, direction)
                     
                     # Convert GTFS stop IDs to complex IDs
-                    complex_ids = []
-                    for stop in stops:
-                        complex_id = cls._complexes.get_complex_id_by_gtfs_stop_id(stop)
-                        if complex_id:
-                            complex_ids.append(complex_id)
+                    complex_ids = [c for c in map(stop_to_complex.get, stops) if c]
                     
                     # Add all nodes with their names and GTFS IDs
                     for complex_id in complex_ids:
@@ -135,27 +195,59 @@ class SubwayGraph:
                                      stop_name=station_name,
                                      gtfs_ids=gtfs_ids)
                     
-                    # Create edges between all pairs of stops in order
-                    for i in range(len(complex_ids)):
-                        for j in range(i + 1, len(complex_ids)):
-                            u = complex_ids[i]
-                            v = complex_ids[j]
-                            
-                            # Add or update edge
-                            if G.has_edge(u, v):
-                                if route not in G[u][v]['lines']:
-                                    G[u][v]['lines'].append(route)
-                            else:
-                                G.add_edge(u, v, lines=[route])
+                    # Record the route on every complex it serves
+                    for complex_id in complex_ids:
+                        G.nodes[complex_id].setdefault('lines', set()).add(route)
+                    
+                    # Create edges between consecutive stops
+                    for u, v in zip(complex_ids, complex_ids[1:]):
+                        # Add or update edge
+                        if G.has_edge(u, v):
+                            G[u][v]['lines'].add(route)
+                        else:
+                            G.add_edge(u, v, lines={route})
+                    
+                    # Keep the stop order so same-line reachability between
+                    # any two stops can be answered at query time
+                    route_index = len(route_stops)
+                    last_position = {c: i for i, c in enumerate(complex_ids)}
+                    route_stops.append((route, complex_ids, last_position))
+                    for i, complex_id in enumerate(complex_ids):
+                        positions = route_positions.setdefault(complex_id, {})
+                        positions.setdefault(route_index, i)
+                    line_order[(route, direction)] = list(dict.fromkeys(complex_ids))
                 except Exception as e:
                     print(f"Warning: Could not process route {route} direction {direction}: {e}")
 
-        # Sort the lines list for each edge
+        # Turn the lines set of each edge into a sorted list
         for u, v, data in G.edges(data=True):
             data['lines'] = sorted(data['lines'])
 
+        # Freeze the lines served at each complex, keeping a sorted copy
+        # for the lines_at_* lookups
+        for _, data in G.nodes(data=True):
+            data['lines'] = frozenset(data.get('lines', ()))
+            data['lines_sorted'] = tuple(sorted(data['lines']))
+
+        # Index station names; where several complexes share a name, the
+        # first one added to the graph wins
+        name_to_id = {}
+        for node, data in G.nodes(data=True):
+            name_to_id.setdefault(data['stop_name'], node)
+        cls._name_to_id = name_to_id
+        cls._id_to_name = {node: name for node, name in G.nodes(data='stop_name')}
+
+        cls._route_stops = route_stops
+        cls._line_order = line_order
+        cls._route_positions = {
+            complex_id: list(positions.items())
+            for complex_id, positions in route_positions.items()
+        }
         cls.G = G
 
+        if cache_path is not None:
+            graph_cache.save_cache(cache_path, cls._CACHE_PREFIX, cls, cls._CACHED_ATTRS)
+
     # ------------------------------------------------------------------ #
     # Convenience helpers
     # ------------------------------------------------------------------ #
@@ -177,6 +269,9 @@ class SubwayGraph:
     def stop_name_to_complex_id(cls, name: str) -> str | None:
         """Find the complex ID for a station name.
         
+        Several complexes share a name (e.g. "23 St"); the lookup then returns
+        the first of them added to the graph.
+        
         Parameters:
             name (str): The station name to look up
             
@@ -188,10 +283,7 @@ class SubwayGraph:
             '618'
         """
         cls._assert_built()
-        for node, data in cls.G.nodes(data=True):
-            if data['stop_name'] == name:
-                return node
-        return None
+        return cls._name_to_id.get(name)
 
     @classmethod
     def complex_id_to_name(cls, complex_id: str) -> str | None:
@@ -208,61 +300,45 @@ class SubwayGraph:
             'Times Square-42 St'
         """
         cls._assert_built()
-        return cls.G.nodes[complex_id]["stop_name"] if complex_id in cls.G else None
+        return cls._id_to_name.get(complex_id)
 
     @classmethod
-    def lines_at_gtfs_stop_id(cls, gtfs_stop_id: str) -> list[str]:
+    def lines_at_gtfs_stop_id(cls, gtfs_stop_id: str) -> tuple[str, ...]:
         """Get all train lines that stop at a particular GTFS stop ID.
         
         Parameters:
             gtfs_stop_id (str): The GTFS stop ID (e.g., "A34" or "A34N")
             
         Returns:
-            list[str]: Sorted list of unique train lines that stop at this GTFS stop
+            tuple[str, ...]: Sorted unique train lines that stop at this GTFS stop
             
         Example:
             >>> SubwayGraph.lines_at_gtfs_stop_id("A34")
-            ['A', 'C', 'E']
+            ('A', 'C', 'E')
         """
         cls._assert_built()
         # Map GTFS stop ID to complex ID
         complex_id = cls._complexes.get_complex_id_by_gtfs_stop_id(gtfs_stop_id)
-        if not complex_id or complex_id not in cls.G:
-            return []
-
-        # Aggregate all lines from edges connected to this complex
-        lines = set()
-        for _, v, data in cls.G.out_edges(complex_id, data=True):
-            lines.update(data.get("lines", []))
-        for u, _, data in cls.G.in_edges(complex_id, data=True):
-            lines.update(data.get("lines", []))
-        return sorted(lines)
+        return cls.lines_at_complex_id(complex_id)
 
     @classmethod
-    def lines_at_complex_id(cls, complex_id: str) -> list[str]:
+    def lines_at_complex_id(cls, complex_id: str) -> tuple[str, ...]:
         """Get all train lines that stop at a particular station complex.
         
         Parameters:
             complex_id (str): The complex ID (e.g., "618" for Times Square)
             
         Returns:
-            list[str]: Sorted list of unique train lines that stop at this complex
+            tuple[str, ...]: Sorted unique train lines that stop at this complex
             
         Example:
             >>> SubwayGraph.lines_at_complex_id("618")
-            ['A', 'C', 'E', 'L']
+            ('A', 'C', 'E', 'L')
         """
         cls._assert_built()
         if not complex_id or complex_id not in cls.G:
-            return []
-
-        # Aggregate all lines from edges connected to this complex
-        lines = set()
-        for _, v, data in cls.G.out_edges(complex_id, data=True):
-            lines.update(data.get("lines", []))
-        for u, _, data in cls.G.in_edges(complex_id, data=True):
-            lines.update(data.get("lines", []))
-        return sorted(lines)
+            return ()
+        return cls.G.nodes[complex_id]['lines_sorted']
 
     # ---------- 2. ordered stop list for a line -------------------------
     @classmethod
@@ -277,44 +353,78 @@ class SubwayGraph:
             direction (int): 0 for north/east-bound, 1 for south/west-bound
             
         Returns:
-            list[str]: List of GTFS stop IDs in order
+            list[str]: List of GTFS stop IDs in order, empty if the route
+                doesn't run in that direction
             
         Example:
             >>> SubwayGraph.ordered_stops("E", 0)
             ['E01N', 'A34N', 'A33N', ...]
         """
-        if route == "A" or route == "4": # This is a lot more expensive, but it's the only way to get the correct order for these lines
-            trips = cls._trips.query("route_id==@route and direction_id==@direction")
-            trip_ids = set(trips.trip_id)
-            # Filter stop_times just once
-            stop_times = cls._stop_times[cls._stop_times.trip_id.isin(trip_ids)]
-            # Group by trip_id and count stops
-            trip_counts = stop_times.groupby("trip_id").size()
-            if trip_counts.empty:
-                return []
-            # Get the trip_id with the most stops
-            best_trip_id = trip_counts.idxmax()
-            # Get the ordered stops for that trip
-            ordered = (
-                stop_times[stop_times.trip_id == best_trip_id]
-                .sort_values("stop_sequence")
-                .stop_id.tolist()
-            )
-            return ordered
+        return list(cls._ordered_stops_cache.get((route, direction), []))
+
+    @classmethod
+    def stations_on_line(cls, route: str, direction: int) -> list[str]:
+        """Get the station complexes served by a subway line, in stop order.
         
-        trip_id = cls._trips.query(
-            "route_id==@route and direction_id==@direction"
-        ).trip_id.iloc[0]
-        return (
-            cls._stop_times.query("trip_id==@trip_id")
-            .sort_values("stop_sequence")
-            .stop_id.tolist()
+        Parameters:
+            route (str): The subway line (e.g., "A", "L", "1")
+            direction (int): 0 for north/east-bound, 1 for south/west-bound
+            
+        Returns:
+            list[str]: Complex IDs in stop order, each listed once; empty if the
+                route doesn't run in that direction
+            
+        Example:
+            >>> SubwayGraph.stations_on_line("E", 0)
+            ['624', '169', '168', '167', ...]
+        """
+        cls._assert_built()
+        return list(cls._line_order.get((route, direction), []))
+
+    @classmethod
+    def _index_ordered_stops(cls, trips: pd.DataFrame, stop_times: pd.DataFrame) -> None:
+        """Precompute the ordered GTFS stops of every route and direction.
+
+        Each route and direction is represented by its first trip, except
+        the A and 4, whose first trips skip part of the line: those use their
+        trip with the most stops (ties go to the smallest trip_id).
+        """
+        first_trip = trips.groupby(['route_id', 'direction_id'], observed=True)['trip_id'].first()
+        longest = trips[trips.route_id.isin(["A", "4"])]
+
+        # Scan stop_times once, keeping only the trips that could be chosen
+        candidates = set(first_trip) | set(longest.trip_id)
+        stop_times = stop_times[stop_times.trip_id.isin(candidates)]
+
+        # The A and 4 first trips skip part of the line, so use their longest trip
+        longest = longest.assign(
+            num_stops=longest.trip_id.map(stop_times.trip_id.value_counts())
+        )
+        longest_trip = (
+            longest[longest.num_stops > 0]
+                   .sort_values(['num_stops', 'trip_id'], ascending=[False, True])
+                   .groupby(['route_id', 'direction_id'], observed=True)['trip_id'].first()
         )
+        trip_by_route_dir = first_trip.to_dict()
+        for key in trip_by_route_dir:
+            if key[0] in ("A", "4"):
+                trip_by_route_dir[key] = longest_trip.get(key)
+
+        representative = stop_times[stop_times.trip_id.isin(set(trip_by_route_dir.values()))]
+        stops_by_trip = {
+            trip_id: stops.tolist()
+            for trip_id, stops in representative.sort_values('stop_sequence', kind='stable')
+                                                .groupby('trip_id', observed=True)['stop_id']
+        }
+        cls._ordered_stops_cache = {
+            key: stops_by_trip.get(trip_id, [])
+            for key, trip_id in trip_by_route_dir.items()
+        }
 
     # ---------- 3. next stops ------------------------------------------
     @classmethod
     def successors(cls, complex_id: str) -> list[str]:
-        """Get all stations directly reachable from a given station.
+        """Get all stations reachable from a given station without a transfer.
         
         Parameters:
             complex_id (str): The complex ID of the starting station
@@ -327,12 +437,95 @@ class SubwayGraph:
             ['327', '619', '620']
         """
         cls._assert_built()
-        return list(cls.G.successors(complex_id))
+        if complex_id not in cls.G:
+            raise nx.NetworkXError(f"The node {complex_id} is not in the digraph.")
+        return list(cls._reachable(complex_id))
+
+    @classmethod
+    def _reachable(cls, complex_id: str) -> dict[str, None]:
+        """Return the stations after complex_id on any of its lines, in stop order."""
+        reachable = {}
+        for route_index, position in cls._route_positions.get(complex_id, ()):
+            stops = cls._route_stops[route_index][1]
+            reachable.update(dict.fromkeys(stops[position + 1:]))
+        return reachable
+
+    @classmethod
+    def _ride_parents(cls, start: str) -> dict[str, str | None]:
+        """Breadth-first search from start where one hop is one ride on one line.
+
+        Each line is scanned at most once from any position: a later scan
+        starting further along it could only find stations that were already
+        reached. Results are cached per start station until the next build.
+        
+        Returns:
+            dict[str, str | None]: The station each reached station was first reached from
+        """
+        parent = cls._parents_from.get(start)
+        if parent is not None:
+            return parent
+        parent = {start: None}
+        queue = deque([start])
+        scanned = {}  # route index -> earliest position scanned so far
+        while queue:
+            u = queue.popleft()
+            for route_index, position in cls._route_positions.get(u, ()):
+                stops = cls._route_stops[route_index][1]
+                stop_at = scanned.get(route_index, len(stops))
+                if position >= stop_at:
+                    continue
+                scanned[route_index] = position
+                for v in stops[position + 1:stop_at]:
+                    if v not in parent:
+                        parent[v] = u
+                        queue.append(v)
+        cls._parents_from[start] = parent
+        return parent
+
+    @classmethod
+    def _ride_predecessors(cls, start: str) -> dict[str, list[str]]:
+        """Breadth-first search from start where one hop is one ride on one line.
+
+        A ride scan only covers the part of a line not already scanned on an
+        earlier level, since stations further along it were reached at least
+        as early. Results are cached per start station until the next build.
+        
+        Returns:
+            dict[str, list[str]]: Shortest-path predecessors of each station reached
+        """
+        pred = cls._preds_from.get(start)
+        if pred is not None:
+            return pred
+        pred = {start: []}
+        level = [start]
+        scanned = {}  # route index -> earliest position scanned on earlier levels
+        while level:
+            next_level = {}
+            scanned_now = {}
+            for u in level:
+                for route_index, position in cls._route_positions.get(u, ()):
+                    stops = cls._route_stops[route_index][1]
+                    stop_at = scanned.get(route_index, len(stops))
+                    for v in stops[position + 1:stop_at]:
+                        if v in pred:
+                            continue
+                        preds = next_level.setdefault(v, [])
+                        if u not in preds:
+                            preds.append(u)
+                    if position < scanned_now.get(route_index, len(stops)):
+                        scanned_now[route_index] = position
+            for route_index, position in scanned_now.items():
+                if position < scanned.get(route_index, len(cls._route_stops[route_index][1])):
+                    scanned[route_index] = position
+            pred.update(next_level)
+            level = list(next_level)
+        cls._preds_from[start] = pred
+        return pred
 
     # ---------- 4. lines on a segment ----------------------------------
     @classmethod
     def connecting_lines(cls, u: str, v: str) -> list[str]:
-        """Get all subway lines that directly connect two stations.
+        """Get all subway lines that run from one station to another without a transfer.
         
         Parameters:
             u (str): Complex ID of the starting station
@@ -346,14 +539,23 @@ class SubwayGraph:
             ['7', 'S']
         """
         cls._assert_built()
-        return cls.G[u][v]["lines"] if cls.G.has_edge(u, v) else []
+        lines = cls._lines_between.get((u, v))
+        if lines is None:
+            lines = tuple(sorted({
+                cls._route_stops[route_index][0]
+                for route_index, position in cls._route_positions.get(u, ())
+                if cls._route_stops[route_index][2].get(v, -1) > position
+            }))
+            cls._lines_between[(u, v)] = lines
+        return list(lines)
 
     @classmethod
     def shortest_path(cls, start: str, end: str) -> list[str] | None:
         """Find the shortest path between two stations.
         
-        This method uses Dijkstra's algorithm to find the path with the fewest
-        transfers between two stations. The path is returned as a list of complex IDs.
+        This method uses a breadth-first search over same-line rides to find the
+        path with the fewest transfers between two stations. The path is returned
+        as a list of complex IDs.
         
         Parameters:
             start (str): Complex ID of the starting station
@@ -367,10 +569,16 @@ class SubwayGraph:
             ['618', '619', '164']  # Path through 5th Ave-53rd St
         """
         cls._assert_built()
-        try:
-            return nx.shortest_path(cls.G, source=start, target=end)
-        except nx.NetworkXNoPath:
+        for node in (start, end):
+            if node not in cls.G:
+                raise nx.NodeNotFound(f"Either source {start} or target {end} is not in G")
+        parent = cls._ride_parents(start)
+        if end not in parent:
             return None
+        path = [end]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path[::-1]
 
     @classmethod
     def shortest_path_with_lines(cls, start: str, end: str) -> list[tuple[str, list[str]]] | None:
@@ -464,11 +672,24 @@ class SubwayGraph:
             [['618', '619', '164'], ['618', '620', '164']]
         """
         cls._assert_built()
-        try:
-            return list(nx.all_shortest_paths(cls.G, source=start, target=end))
-        except nx.NetworkXNoPath:
+        if start not in cls.G:
+            raise nx.NodeNotFound(f"Source {start} is not in G")
+        pred = cls._ride_predecessors(start)
+        if end not in pred:
             return []
 
+        # Enumerate every chain of predecessors from end back to start
+        paths = []
+        stack = [[end]]
+        while stack:
+            path = stack.pop()
+            preds = pred[path[-1]]
+            if not preds:
+                paths.append(path[::-1])
+            for node in preds:
+                stack.append(path + [node])
+        return paths
+
     @classmethod
     def get_directions_for_path(cls, path: list[str]) -> list[dict]:
         """Get structured data for a specific path showing stations and available lines.
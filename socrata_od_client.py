@@ -7,8 +7,9 @@ import sys
 sys.dont_write_bytecode = True
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-import io
 
 # List of columns to query from the API
 QUERY_COLUMNS = [
@@ -23,7 +24,36 @@ QUERY_COLUMNS = [
     "estimated_average_ridership"
 ]
 
-def get_ridership_data(
+# Column types for parsing the CSV response; ids and time fields are
+# nullable so a missing value doesn't force the column to float
+COLUMN_DTYPES = {
+    "year": "Int64",
+    "month": "Int64",
+    "hour_of_day": "Int64",
+    "origin_station_complex_id": "Int64",
+    "destination_station_complex_id": "Int64",
+    "estimated_average_ridership": "float64",
+}
+
+# Base URL for the dataset
+DATASET_URL = "https://data.ny.gov/resource/y2qv-fytt.csv"
+
+# (connect, read) timeout in seconds for every request
+REQUEST_TIMEOUT = (3, 30)
+
+# Shared session so repeated queries reuse the pooled keep-alive connection
+# to data.ny.gov instead of a fresh TCP/TLS handshake each time; throttled
+# and transient server errors are retried with backoff
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=5,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    # Hand the last response back so _fetch raises HTTPError as before
+    raise_on_status=False,
+)))
+
+def _build_params(
     year: int = None,
     month: int = None,
     day_of_week: str = None,
@@ -31,35 +61,10 @@ def get_ridership_data(
     origin_station_complex_id: int = None,
     destination_station_complex_id: int = None,
     app_token: str = None
-) -> pd.DataFrame:
+) -> dict:
     """
-    Fetch MTA ridership data from the Socrata API.
-    
-    Parameters
-    ----------
-    year : int, optional
-        Filter by year
-    month : int, optional
-        Filter by month (1-12)
-    day_of_week : str, optional
-        Filter by day type ('Weekday', 'Saturday', 'Sunday')
-    hour_of_day : int, optional
-        Filter by hour_of_day (0-23)
-    origin_station_complex_id : int, optional
-        Filter by origin station complex ID
-    destination_station_complex_id : int, optional
-        Filter by destination station complex ID
-    app_token : str, optional
-        Socrata application token for higher rate limits
-        
-    Returns
-    -------
-    pandas.DataFrame
-        DataFrame containing the ridership data
+    Build the SoQL query parameters for the given filters.
     """
-    # Base URL for the dataset
-    url = "https://data.ny.gov/resource/y2qv-fytt.csv"
-    
     # Build query parameters
     params = {}
     if app_token:
@@ -85,22 +90,104 @@ def get_ridership_data(
         
     if where_parts:
         params['$where'] = ' AND '.join(where_parts)
+    return params
+
+def _fetch(params: dict) -> pd.DataFrame:
+    """
+    Run one query against the dataset and parse the CSV response.
+    """
+    # Make the request and parse the CSV straight off the socket, so the
+    # body is never held in memory as one big string
+    headers = {"Accept-Encoding": "gzip"}
+    with _SESSION.get(DATASET_URL, params=params, headers=headers, stream=True,
+                      timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return pd.read_csv(response.raw, dtype=COLUMN_DTYPES)
+
+def get_ridership_data(
+    year: int = None,
+    month: int = None,
+    day_of_week: str = None,
+    hour_of_day: int = None,
+    origin_station_complex_id: int = None,
+    destination_station_complex_id: int = None,
+    app_token: str = None
+) -> pd.DataFrame:
+    """
+    Fetch MTA ridership data from the Socrata API.
     
-    # Make the request
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    
-    # Read CSV into DataFrame
-    df = pd.read_csv(io.StringIO(response.text))
+    Parameters
+    ----------
+    year : int, optional
+        Filter by year
+    month : int, optional
+        Filter by month (1-12)
+    day_of_week : str, optional
+        Filter by day type ('Weekday', 'Saturday', 'Sunday')
+    hour_of_day : int, optional
+        Filter by hour_of_day (0-23)
+    origin_station_complex_id : int, optional
+        Filter by origin station complex ID
+    destination_station_complex_id : int, optional
+        Filter by destination station complex ID
+    app_token : str, optional
+        Socrata application token for higher rate limits
+        
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame containing the ridership data
+    """
+    params = _build_params(
+        year, month, day_of_week, hour_of_day,
+        origin_station_complex_id, destination_station_complex_id, app_token
+    )
+    return _fetch(params)
+
+def iter_ridership_data(
+    year: int = None,
+    month: int = None,
+    day_of_week: str = None,
+    hour_of_day: int = None,
+    origin_station_complex_id: int = None,
+    destination_station_complex_id: int = None,
+    app_token: str = None,
+    batch_size: int = 50000
+):
+    """
+    Fetch MTA ridership data from the Socrata API in pages.
     
-    # Convert numeric columns
-    numeric_cols = ['year', 'month', 'hour_of_day', 'origin_station_complex_id', 
-                   'destination_station_complex_id', 'estimated_trips']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    Takes the same filters as get_ridership_data, but keeps requesting
+    pages of batch_size rows until the result set is exhausted. Rows are
+    ordered by the Socrata row id so pages don't overlap.
     
-    return df
+    Parameters
+    ----------
+    batch_size : int, optional
+        Number of rows per request
+        
+    Yields
+    ------
+    pandas.DataFrame
+        One page of ridership data
+    """
+    params = _build_params(
+        year, month, day_of_week, hour_of_day,
+        origin_station_complex_id, destination_station_complex_id, app_token
+    )
+    params['$order'] = ':id'
+    params['$limit'] = batch_size
+    offset = 0
+    while True:
+        params['$offset'] = offset
+        df = _fetch(params)
+        if df.empty:
+            return
+        yield df
+        if len(df) < batch_size:
+            return
+        offset += batch_size
 
 # Example usage
 if __name__ == "__main__":